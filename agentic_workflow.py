@@ -4,40 +4,39 @@ from datetime import datetime, timezone
 from typing import Optional
 import dotenv
 import yaml
-from azure.storage.blob import BlobServiceClient
-from docx import Document
-from PyPDF2 import PdfReader
-from crewai import Agent, Task, Crew, LLM
+from utils.blob_cache import download_blob_cached, get_blob_service_client
+from utils.document_model import extract_document, join_guide_and_upload
+from utils.llm_gateway import PRIORITY_INTERACTIVE, gate_llm, get_gateway
+from utils.result_store import RequestTooLarge, check_request_size
 
 def _download_blob_to_local(blob_path: str) -> str:
     print(f"[⏬] Downloading blob: {blob_path}")
     connection_string = os.environ["AZURE_STORAGE_CONNECTION_STRING"]
     container_name = os.environ["AZURE_CONTAINER_NAME"]
 
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+    blob_service_client = get_blob_service_client(connection_string)
     blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
+    # Enforce the per-request cap before any bytes are downloaded
+    check_request_size(blob_client.get_blob_properties().size)
 
     _, ext = os.path.splitext(os.path.basename(blob_path))
     fd, tmp_path = tempfile.mkstemp(suffix=ext)
-    os.close(fd)
 
-    with open(tmp_path, "wb") as f:
-        f.write(blob_client.download_blob().readall())
+    # Stream to disk instead of holding the whole blob in memory
+    with os.fdopen(fd, "wb") as f:
+        blob_client.download_blob().readinto(f)
 
     print(f"[✅] Blob saved: {tmp_path}")
     return tmp_path
 
 def _extract_text(file_path: str) -> str:
     print(f"[📄] Extracting text: {file_path}")
-    if file_path.endswith(".pdf"):
-        with open(file_path, "rb") as f:
-            reader = PdfReader(f)
-            return "\n".join([p.extract_text() or "" for p in reader.pages])
-    elif file_path.endswith(".docx"):
-        return "\n".join([p.text for p in Document(file_path).paragraphs])
-    raise ValueError("Unsupported file type")
-
-def _load_agents(yaml_path: str, model_name: str) -> dict:
+    # Headings and tables survive as markdown instead of being flattened away
+    return extract_document(file_path).to_text()
+
+def _load_agents(yaml_path: str, model_name: str, priority: int = PRIORITY_INTERACTIVE) -> dict:
+    from crewai import Agent, LLM
+
     print(f"[INFO] Loading agents from: {yaml_path}")
     with open(yaml_path, "r", encoding="utf-8") as f:
         config = yaml.safe_load(f) or {}
@@ -61,7 +60,7 @@ def _load_agents(yaml_path: str, model_name: str) -> dict:
             model = f"azure/{model}"
 
         try:
-            llm = LLM(model=model)
+            llm = gate_llm(LLM(model=model), priority)
         except Exception as e:
             print(f"[ERROR] Failed to init LLM for {name}: {e}")
             raise
@@ -78,7 +77,7 @@ def _load_agents(yaml_path: str, model_name: str) -> dict:
     return agents
 
 
-def run_agents(guide_text: str, user_prompt: str = "") -> str:
+def run_agents(guide_text: str, user_prompt: str = "", outline: str = "", priority: int = PRIORITY_INTERACTIVE) -> str:
     dotenv.load_dotenv()
     os.environ["AZURE_API_BASE"] = os.getenv("AZURE_API_BASE", "").strip()
     os.environ["AZURE_API_KEY"] = os.getenv("AZURE_API_KEY", "").strip()
@@ -137,7 +136,7 @@ def run_agents(guide_text: str, user_prompt: str = "") -> str:
 
     # ---------- Agents ----------
     try:
-        agents = _load_agents("agents.yaml", model_name)
+        agents = _load_agents("agents.yaml", model_name, priority)
     except Exception as e:
         return f"Failed to load agents. Details: {e}"
 
@@ -149,9 +148,9 @@ def run_agents(guide_text: str, user_prompt: str = "") -> str:
     from crewai import Task, Crew, LLM
     # (Optional) make agents conservative if supported by your CrewAI version
     try:
-        planner.llm = LLM(model=f"azure/{model_name}", temperature=0, top_p=1)
-        writer.llm  = LLM(model=f"azure/{model_name}", temperature=0, top_p=1)
-        critic.llm  = LLM(model=f"azure/{model_name}", temperature=0, top_p=1)
+        planner.llm = gate_llm(LLM(model=f"azure/{model_name}", temperature=0, top_p=1), priority)
+        writer.llm  = gate_llm(LLM(model=f"azure/{model_name}", temperature=0, top_p=1), priority)
+        critic.llm  = gate_llm(LLM(model=f"azure/{model_name}", temperature=0, top_p=1), priority)
     except Exception:
         pass  # older CrewAI may not accept kwargs here
     # ---------- RULE BLOCKS ----------
@@ -176,6 +175,16 @@ def run_agents(guide_text: str, user_prompt: str = "") -> str:
     - If front matter/disclaimer exists in the source, render it verbatim at the top.
     """
 
+    # Headings extracted from the uploaded file stand in for the planner's output
+    if outline:
+        SECTION_POLICY = "\n".join([
+            "### SECTION OUTLINE (extracted from the uploaded file's headings, in order)",
+            outline,
+            "- Render these sections in this order. Do NOT add “Recommendations”, “Learning Outcomes”, "
+            "or other sections that are not in the outline.",
+            "- If front matter/disclaimer exists in the source, render it verbatim at the top.",
+        ])
+
     # ---------- DESCRIPTIONS (built safely) ----------
     desc_plan = "\n".join([
         SOURCE_FIRST,            # <-- your computed context
@@ -217,17 +226,21 @@ def run_agents(guide_text: str, user_prompt: str = "") -> str:
     ])
 
     # ---------- TASKS ----------
-    plan_task = Task(
-        description=desc_plan,
-        expected_output="Ordered bullets of planned sections",
-        agent=planner,
-    )
+    plan_task = None
+    if outline:
+        print("[🗂️] Using extracted section outline, skipping planner")
+    else:
+        plan_task = Task(
+            description=desc_plan,
+            expected_output="Ordered bullets of planned sections",
+            agent=planner,
+        )
 
     draft_task = Task(
         description=desc_draft,
         expected_output="Case draft closely matching source structure (no meta)",
         agent=writer,
-        context=[plan_task],
+        context=[plan_task] if plan_task else [],
     )
 
     verify_task = Task(
@@ -241,17 +254,18 @@ def run_agents(guide_text: str, user_prompt: str = "") -> str:
         description=desc_final,
         expected_output="Final classroom-ready case text only",
         agent=writer,
-        context=[plan_task, draft_task, verify_task],
+        context=[t for t in (plan_task, draft_task, verify_task) if t],
     )
 
     crew = Crew(
-        agents=[planner, writer, critic],
-        tasks=[plan_task, draft_task, verify_task, final_task],
+        agents=[planner, writer, critic] if plan_task else [writer, critic],
+        tasks=[t for t in (plan_task, draft_task, verify_task, final_task) if t],
         verbose=True
     )
 
     print("[🚀] Crew kickoff")
     result = crew.kickoff()
+    print(f"[🚦] LLM gateway: {get_gateway().metrics()}")
 
     # ---------- POST-CLEANUP (local only) ----------
     def sanitize_output(source: str, out: str) -> str:
@@ -278,24 +292,36 @@ def run_agents(guide_text: str, user_prompt: str = "") -> str:
 
 
 async def generate_case_from_blob(blob_path: Optional[str], user_prompt: str) -> str:
+    """
+    Generate a case from the writer's guide, the uploaded file (if any) and the prompt.
+
+    Raises:
+        RequestTooLarge: If the uploaded file exceeds MAX_REQUEST_BYTES.
+    """
     print("[📘] Starting case generation...")
 
     try:
-        guide_text = _extract_text(_download_blob_to_local("internal-docs/CaseWritingGuide.pdf"))
+        guide_text = _extract_text(download_blob_cached("internal-docs/CaseWritingGuide.pdf"))
     except Exception as e:
         return f"❌ Failed to load guide: {e}"
 
+    outline = ""
     if blob_path:
         try:
             user_file = _download_blob_to_local(blob_path)
-            user_text = _extract_text(user_file)
-            # keep the user's content appended to the guide (as before)
-            guide_text += f"\n\n---\n\nAdditional Context from Uploaded File:\n\n{user_text}"
+            user_doc = extract_document(user_file)
+            # Only DOCX heading styles or clearly numbered PDF sections replace the planner
+            outline = user_doc.trusted_outline_text()
+            # keep the user's content appended to the guide (as before), built in one buffer
+            guide_text = join_guide_and_upload(guide_text, user_doc)
+            del user_doc
+        except RequestTooLarge:
+            raise
         except Exception as e:
             return f"❌ Failed to load user file: {e}"
 
     try:
         # <<< key change: forward BOTH the aggregated text and the user's prompt >>>
-        return run_agents(guide_text, user_prompt)
+        return run_agents(guide_text, user_prompt, outline)
     except Exception as e:
         return f"❌ CrewAI execution failed: {e}"
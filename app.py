@@ -92,12 +92,54 @@
 import streamlit as st
 import os
 import asyncio
+import threading
+import time
+import uuid
 import requests
 from datetime import datetime, timezone
 from utils.agentic_workflow import generate_case_from_blob
 from utils.azure_blob_utils import upload_to_blob, upload_text_to_blob
+from utils.request_router import (
+    ROUTE_DUPLICATE,
+    ROUTE_MISSING_INPUT,
+    ROUTE_REJECTED,
+    ROUTE_SMALL_TALK,
+    remember_result,
+    route_request,
+    router_stats,
+)
+from utils.result_store import RequestTooLarge, get_result, store_result
+from utils.warmup import preload_worker
 
 st.set_page_config(page_title="Agentic Case Generator1", layout="wide")
+
+# Load-test hook for scripts/load_test.py (off unless LOADTEST_ENABLED=1):
+# ?loadtest=<ms> holds the GIL for that long (at most 10 s), like a blocking
+# generation, so the test measures how script runs scale across workers.
+if os.getenv("LOADTEST_ENABLED") == "1" and "loadtest" in st.query_params:
+    try:
+        loadtest_ms = min(max(int(st.query_params["loadtest"]), 0), 10_000)
+    except ValueError:
+        loadtest_ms = 0
+    deadline = time.perf_counter() + loadtest_ms / 1000
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    st.write("loadtest done")
+    st.stop()
+
+
+# The case workflow imports the Azure SDK and PDF/DOCX parsers on first use.
+# Warm them, and a pooled blob connection, once per worker process in the
+# background so the first Generate click does not pay for it.
+@st.cache_resource(show_spinner=False)
+def _start_preload() -> threading.Thread:
+    thread = threading.Thread(target=preload_worker, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+_start_preload()
+
 st.title("📄 Agentic AI Case Builder")
 st.markdown("---")
 
@@ -109,24 +151,39 @@ prompt = st.text_area("Prompt", placeholder="e.g., Generate a teaching case from
 st.subheader("2. Upload a file (PDF or DOCX)")
 uploaded_file = st.file_uploader("Browse and Upload", type=["pdf", "docx"])
 
-# Initialize session state
-if "generated_case" not in st.session_state:
-    st.session_state.generated_case = ""
+# Initialize session state. Only the result id is kept per session; the case
+# text lives in the bounded, process-wide result store.
+if "generated_case_id" not in st.session_state:
+    st.session_state.generated_case_id = ""
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if "prompt_used" not in st.session_state:
     st.session_state.prompt_used = ""
 
 # Step 3: Generate Case
 st.subheader("3. Generate Case")
+regenerate = st.checkbox("Generate a fresh case even if this prompt and file were just used")
 if st.button("Generate Case"):
-    if not prompt and not uploaded_file:
-        st.warning("⚠️ Please enter a prompt or upload a file before generating the case.")
-    elif uploaded_file and not prompt:
-        st.warning("⚠️ Prompt required for generating a case from the file.")
+    # Answer trivial requests locally before touching Azure or the agents
+    decision = route_request(prompt, uploaded_file, st.session_state.session_id, regenerate)
+    if decision.route in (ROUTE_MISSING_INPUT, ROUTE_REJECTED):
+        st.warning(decision.response)
+    elif decision.route == ROUTE_SMALL_TALK:
+        st.info(decision.response)
+    elif decision.route == ROUTE_DUPLICATE:
+        st.info("♻️ Same prompt and file as your recent request, showing the previous case. "
+                "Tick the box above to generate a fresh one.")
+        st.session_state.generated_case_id = decision.result_id
+        st.session_state.prompt_used = prompt
+        st.subheader("📘 Case Output")
+        st.markdown(decision.response)
     elif not uploaded_file:
         st.info("💬 Generating case based on prompt only (no document uploaded)...")
         try:
             result = asyncio.run(generate_case_from_blob(None, prompt))
-            st.session_state.generated_case = result
+            result_id = store_result(result)
+            remember_result(decision.key, result_id, result)
+            st.session_state.generated_case_id = result_id
             st.session_state.prompt_used = prompt
             st.subheader("📘 Case Output")
             st.markdown(result)
@@ -140,27 +197,37 @@ if st.button("Generate Case"):
     else:
         try:
             blob_path = upload_to_blob(uploaded_file)
-            st.subheader("📘 Case Output")
             with st.spinner("Generating the case using AI agents..."):
                 result = asyncio.run(generate_case_from_blob(blob_path, prompt))
-                st.session_state.generated_case = result
+                result_id = store_result(result)
+                remember_result(decision.key, result_id, result)
+                st.session_state.generated_case_id = result_id
                 st.session_state.prompt_used = prompt
+                st.subheader("📘 Case Output")
                 st.markdown(result)
                 try:
                     case_path = upload_text_to_blob(result, folder="results/")
                     st.success(f"✅ Case saved to Azure Blob: {case_path}")
                 except Exception as save_err:
                     st.warning(f"⚠️ Could not upload case to Azure Blob: {save_err}")
+        except RequestTooLarge as e:
+            # Oversize uploads are not stored, shown as a case or offered to Teams
+            st.warning(str(e))
         except Exception as e:
             st.error(f"❌ Error: {e}")
+    st.caption(f"LLM runs avoided by the request router: {router_stats()['llm_runs_avoided']}")
 
 # Step 4: Optional Teams Send
-if st.session_state.generated_case:
+if st.session_state.generated_case_id:
     st.subheader("4. Optional: Send to Teams")
     if st.button("📤 Send Case to Microsoft Teams"):
+        generated_case = get_result(st.session_state.generated_case_id)
+        if generated_case is None:
+            st.warning("⚠️ This case is no longer in memory. Please generate it again.")
+            st.stop()
         try:
             teams_url = st.secrets["TEAMS_WEBHOOK_URL"]
-            preview = st.session_state.generated_case[:3000]  # Trim to fit Teams message limit
+            preview = generated_case[:3000]  # Trim to fit Teams message limit
             message = {
                 "text": f"📘 *New Case Generated!*\n\n📝 *Prompt:* {st.session_state.prompt_used}\n\n🗂️ *Case Output:*\n```\n{preview}\n```"
             }
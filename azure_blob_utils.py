@@ -1,5 +1,5 @@
 import os
-from azure.storage.blob import BlobServiceClient
+from utils.blob_cache import get_blob_service_client
 import streamlit as st
 import uuid
 from datetime import datetime, timezone
@@ -32,7 +32,7 @@ def upload_to_blob(file, folder: str = "raw/") -> str:
     container_name = st.secrets["AZURE_CONTAINER_NAME"]
 
     # Connect to Azure Blob storage and upload the file
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+    blob_service_client = get_blob_service_client(connection_string)
     blob_client = blob_service_client.get_blob_client(container=container_name, blob=full_path)
     blob_client.upload_blob(file, overwrite=True)
     return full_path
@@ -60,7 +60,7 @@ def upload_text_to_blob(text: str, folder: str = "results/") -> str:
     blob_path = f"{folder}{today}/{filename}"
     connection_string = st.secrets["AZURE_STORAGE_CONNECTION_STRING"]
     container_name = st.secrets["AZURE_CONTAINER_NAME"]
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+    blob_service_client = get_blob_service_client(connection_string)
     blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
     # Upload the text by converting it to bytes
     blob_client.upload_blob(text.encode("utf-8"), overwrite=True)
@@ -14,4 +14,52 @@ else
   exit 1
 fi
 
+# --- Streamlit workers ---
+# STREAMLIT_WORKERS processes listen on consecutive ports from 8501. The same
+# count drives supervisord's numprocs and the nginx upstream block.
+STREAMLIT_WORKERS="${STREAMLIT_WORKERS:-1}"
+if ! [[ "$STREAMLIT_WORKERS" =~ ^[1-9][0-9]*$ ]]; then
+  echo "STREAMLIT_WORKERS must be a positive integer (got '$STREAMLIT_WORKERS')" >&2
+  exit 1
+fi
+
+SUPERVISORD_CONF="/etc/supervisor/conf.d/supervisord.conf"
+sed -i "s/^numprocs=.*/numprocs=${STREAMLIT_WORKERS}/" "$SUPERVISORD_CONF"
+
+UPSTREAM_CONF="/etc/nginx/streamlit_upstream.conf"
+{
+  echo "upstream streamlit_upstream {"
+  echo "  hash \$sticky_key consistent;"
+  for ((i = 0; i < STREAMLIT_WORKERS; i++)); do
+    echo "  server 127.0.0.1:$((8501 + i));"
+  done
+  echo "  keepalive 16;"
+  echo "}"
+} > "$UPSTREAM_CONF"
+
+# Which worker served a request is only exposed for load tests
+LOADTEST_CONF="/etc/nginx/loadtest_headers.conf"
+if [[ "${LOADTEST_ENABLED:-0}" == "1" ]]; then
+  echo "add_header X-Upstream \$upstream_addr always;" > "$LOADTEST_CONF"
+else
+  : > "$LOADTEST_CONF"
+fi
+
+# Per-request size cap (bytes). Streamlit's own upload limit is kept in step so
+# oversized files are refused before they are buffered in a worker's memory.
+MAX_REQUEST_BYTES="${MAX_REQUEST_BYTES:-26214400}"
+export MAX_REQUEST_BYTES
+export STREAMLIT_SERVER_MAX_UPLOAD_SIZE="${STREAMLIT_SERVER_MAX_UPLOAD_SIZE:-$(( (MAX_REQUEST_BYTES + 1048575) / 1048576 ))}"
+
+# Shared across workers so the writer's guide is downloaded once per container
+export CASE_CACHE_DIR="${CASE_CACHE_DIR:-/tmp/case-cache}"
+mkdir -p "$CASE_CACHE_DIR"
+
+# --- Optional warm-up (WARMUP=0 to skip) ---
+# Pre-imports heavy modules, prints their import times and pre-fetches the
+# writer's guide into CASE_CACHE_DIR. A failure here never blocks start-up.
+if [[ "${WARMUP:-1}" == "1" ]]; then
+  (cd /app && python -m utils.warmup) || echo "Warm-up failed, continuing" >&2
+fi
+
 exec /usr/bin/supervisord -c /etc/supervisor/conf.d/supervisord.conf
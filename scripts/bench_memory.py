@@ -0,0 +1,102 @@
+"""
+Memory profile of source-text assembly as the uploaded document grows.
+
+Builds synthetic documents of increasing size and measures, with
+tracemalloc, the peak memory needed to turn them into the combined
+guide + upload text sent to the agents:
+
+  legacy    - "\\n".join of a list of block strings, then `guide_text +=`
+  streaming - utils.document_model.join_guide_and_upload (one buffer)
+
+Both paths start from an already-built DocumentModel, so the peaks cover
+text assembly only, not PDF/DOCX extraction.
+
+It also reports how much memory the bounded result store keeps for N stored
+cases (measured with tracemalloc), compared with one copy per session in
+st.session_state.
+
+    python scripts/bench_memory.py --sizes 1,4,16,32
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.document_model import HEADING, PARAGRAPH, TABLE, Block, DocumentModel, join_guide_and_upload  # noqa: E402
+from utils import result_store  # noqa: E402
+
+MB = 1024 * 1024
+GUIDE_TEXT = "Case writing guide line. " * (2 * MB // 25)
+
+
+def _synthetic_document(size_mb: int) -> DocumentModel:
+    doc = DocumentModel()
+    para = "The program office reviewed the schedule and cost data. " * 8
+    for _ in range(size_mb * MB // len(para)):
+        n = len(doc.blocks)
+        if n % 40 == 0:
+            doc.blocks.append(Block(HEADING, f"Section {n // 40}", n // 20 + 1, 1))
+        elif n % 40 == 20:
+            doc.blocks.append(Block(TABLE, page=n // 20 + 1, rows=[["Metric", "Value"], ["CPI", "0.97"]]))
+        doc.blocks.append(Block(PARAGRAPH, para, n // 20 + 1))
+    return doc
+
+
+def _legacy(guide_text: str, doc: DocumentModel) -> str:
+    parts = []
+    for b in doc.blocks:
+        if b.kind == TABLE:
+            parts.extend("| " + " | ".join(row) + " |" for row in b.rows)
+        else:
+            parts.append(b.text)
+    user_text = "\n".join(parts)
+    guide_text += f"\n\n---\n\nAdditional Context from Uploaded File:\n\n{user_text}"
+    return guide_text
+
+
+def _peak_mb(fn, *args) -> float:
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / MB
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,4,16,32", help="Comma-separated document sizes in MB")
+    parser.add_argument("--sessions", type=int, default=200, help="Sessions holding a case for the store comparison")
+    parser.add_argument("--case-kb", type=int, default=64, help="Size of one generated case in KB")
+    args = parser.parse_args()
+
+    print("Peak memory to assemble guide + upload text (MB)")
+    print(f"{'doc MB':>7} {'legacy':>9} {'streaming':>10} {'ratio':>7}")
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        doc = _synthetic_document(size)
+        legacy = _peak_mb(_legacy, GUIDE_TEXT, doc)
+        streaming = _peak_mb(join_guide_and_upload, GUIDE_TEXT, doc)
+        print(f"{size:>7} {legacy:>9.1f} {streaming:>10.1f} {legacy / streaming:>6.2f}x")
+
+    case = "c" * (args.case_kb * 1024)
+    tracemalloc.start()
+    for i in range(args.sessions):
+        # A distinct string per session, as each generation produces its own case
+        result_store.store_result(case[:-1] + str(i % 10))
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = result_store.result_store_stats()
+    print()
+    print(f"{args.sessions} sessions x {args.case_kb} KB case")
+    print(f"  one copy per session : {args.sessions * len(case) / MB:8.1f} MB")
+    print(
+        f"  bounded result store : {retained / MB:8.1f} MB retained, {stats['bytes'] / MB:.1f} MB accounted "
+        f"({stats['entries']} entries, limits {result_store.RESULT_STORE_MAX_ENTRIES} / "
+        f"{result_store.RESULT_STORE_MAX_BYTES / MB:.0f} MB)"
+    )
+
+
+if __name__ == "__main__":
+    main()
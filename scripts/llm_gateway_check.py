@@ -0,0 +1,193 @@
+"""
+Exercise utils.llm_gateway against a local mock of the Azure OpenAI endpoint.
+
+The mock accepts chat-completion POSTs, enforces its own requests-per-second
+and concurrency quota, and answers over-quota calls with 429 plus
+retry-after / x-ratelimit-* headers, as Azure does. A mix of interactive and
+batch jobs is sent twice: once directly with blind fixed-delay retries, once
+through the gateway. The report shows 429 counts, latency per priority and
+the gateway's queue/wait metrics. A final run checks that, with calls larger
+than the token burst, the admitted token rate still matches the configured TPM.
+
+    python scripts/llm_gateway_check.py --jobs 40 --server-rps 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.llm_gateway import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMGateway  # noqa: E402
+
+
+class MockRateLimitError(Exception):
+    """Mimics litellm.RateLimitError: status_code plus the raw response."""
+
+    def __init__(self, response):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = response
+
+
+class _MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def _make_handler(rps: int, concurrency: int, latency: float, stats: dict):
+    lock = threading.Lock()
+    state = {"window": int(time.time()), "count": 0, "active": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                now = time.time()
+                if int(now) != state["window"]:
+                    state["window"], state["count"] = int(now), 0
+                limited = state["count"] >= rps or state["active"] >= concurrency
+                if not limited:
+                    state["count"] += 1
+                    state["active"] += 1
+                remaining = max(0, rps - state["count"])
+                reset = 1.0 - (now - int(now))
+                stats["429" if limited else "200"] += 1
+
+            if limited:
+                self.send_response(429)
+                self.send_header("retry-after-ms", str(int(reset * 1000) + 50))
+                self.send_header("x-ratelimit-remaining-requests", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            try:
+                time.sleep(latency)
+                body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("x-ratelimit-remaining-requests", str(remaining))
+                self.send_header("x-ratelimit-reset-requests", f"{int(reset * 1000)}ms")
+                self.end_headers()
+                self.wfile.write(body)
+            finally:
+                with lock:
+                    state["active"] -= 1
+
+    return Handler
+
+
+def _post(url: str, gateway: LLMGateway = None) -> None:
+    req = urllib.request.Request(url, data=b'{"messages": []}', headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            resp.read()
+            if gateway is not None:
+                gateway.observe_headers(resp.headers)
+    except urllib.error.HTTPError as e:
+        if e.code == 429:
+            raise MockRateLimitError(e) from None
+        raise
+
+
+def _run(url: str, jobs: int, gateway: LLMGateway = None) -> dict:
+    latencies = {PRIORITY_INTERACTIVE: [], PRIORITY_BATCH: []}
+
+    def job(i: int) -> None:
+        # Every fourth job is interactive, the rest are batch
+        priority = PRIORITY_INTERACTIVE if i % 4 == 0 else PRIORITY_BATCH
+        start = time.perf_counter()
+        if gateway is not None:
+            gateway.call(lambda: _post(url, gateway), priority=priority, tokens=500, max_retries=20)
+        else:
+            for _ in range(200):
+                try:
+                    _post(url)
+                    break
+                except MockRateLimitError:
+                    time.sleep(0.1)  # blind retry
+        latencies[priority].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(job, range(jobs)))
+    return {"elapsed": time.perf_counter() - start, "latencies": latencies}
+
+
+def _report(name: str, run: dict, stats: dict) -> None:
+    print(f"{name}: {run['elapsed']:.2f}s total, {stats['200']} ok, {stats['429']} x 429")
+    for priority, label in ((PRIORITY_INTERACTIVE, "interactive"), (PRIORITY_BATCH, "batch")):
+        lat = run["latencies"][priority]
+        if lat:
+            print(f"    {label:<12} p50 {statistics.median(lat):6.2f}s   max {max(lat):6.2f}s   (n={len(lat)})")
+
+
+def _rate_check(tpm: int, seconds: float) -> None:
+    """Admit calls of twice the token burst for `seconds` and compare the rate with `tpm`."""
+    gateway = LLMGateway(tpm=tpm, burst_seconds=1)
+    tokens = int(tpm / 60 * 2)
+    admitted = []
+    deadline = time.monotonic() + seconds
+
+    def worker() -> None:
+        while time.monotonic() < deadline:
+            gateway.call(lambda: None, tokens=tokens)
+            admitted.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # The first call is admitted from the initial burst; rate is measured after it
+    admitted.sort()
+    rate = (len(admitted) - 1) * tokens / (admitted[-1] - admitted[0]) * 60
+    print(f"rate   : {rate:,.0f} tokens/min admitted vs {tpm:,} configured ({len(admitted)} calls of {tokens})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--server-rps", type=int, default=5, help="Mock quota: requests per second")
+    parser.add_argument("--server-concurrency", type=int, default=4, help="Mock quota: concurrent requests")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock response time in seconds")
+    parser.add_argument("--rate-tpm", type=int, default=60000, help="TPM for the long-run rate check")
+    parser.add_argument("--rate-seconds", type=float, default=10, help="Duration of the rate check (0 = skip)")
+    args = parser.parse_args()
+
+    for gated in (False, True):
+        stats = {"200": 0, "429": 0}
+        server = _MockServer(
+            ("127.0.0.1", 0), _make_handler(args.server_rps, args.server_concurrency, args.latency, stats)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/openai/deployments/mock/chat/completions"
+        try:
+            if gated:
+                gateway = LLMGateway(
+                    rpm=args.server_rps * 60, max_in_flight=args.server_concurrency, burst_seconds=1
+                )
+                _report("gateway", _run(url, args.jobs, gateway), stats)
+                print(f"    metrics      {gateway.metrics()}")
+            else:
+                _report("direct ", _run(url, args.jobs), stats)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    if args.rate_seconds > 0:
+        _rate_check(args.rate_tpm, args.rate_seconds)
+
+
+if __name__ == "__main__":
+    main()
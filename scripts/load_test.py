@@ -0,0 +1,125 @@
+"""
+Local load test for the nginx + Streamlit container.
+
+Each simulated user loads the page (which sets the sticky `stw` cookie),
+opens Streamlit's websocket with that cookie and asks for a script run with
+`?loadtest=<ms>`. With LOADTEST_ENABLED=1, app.py then holds the GIL for that
+many milliseconds, like a blocking case generation. A single Streamlit
+process runs these one at a time, so throughput should grow with the number
+of workers. The report gives throughput and latency per concurrency level,
+plus how sessions were spread over workers (from the X-Upstream header that
+nginx adds when LOADTEST_ENABLED=1).
+
+Needs streamlit (for its protobuf messages) and the `websockets` package.
+Compare 1 worker with N workers:
+
+    docker run -e STREAMLIT_WORKERS=4 -e LOADTEST_ENABLED=1 \\
+        -e BASIC_AUTH_USERNAME=u -e BASIC_AUTH_PASSWORD=p -p 8000:8000 caseapp
+    python scripts/load_test.py --url http://localhost:8000 --user u --password p --concurrency 1,4,16
+"""
+import argparse
+import asyncio
+import base64
+import statistics
+import time
+import urllib.request
+from collections import Counter
+
+try:
+    import websockets
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+except ImportError as e:
+    raise SystemExit(f"load_test.py needs streamlit and websockets installed ({e})")
+
+
+def _load_page(url: str, headers: dict) -> tuple[str, str]:
+    """GET the app page and return (sticky_cookie, upstream_worker)."""
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=120) as resp:
+        resp.read()
+        cookie = next(
+            (c.split(";", 1)[0] for c in resp.headers.get_all("Set-Cookie") or [] if c.startswith("stw=")), ""
+        )
+        # Without nginx in front, report the port that was hit
+        return cookie, resp.headers.get("X-Upstream") or url.split("//", 1)[1].split("/", 1)[0]
+
+
+async def _session(base_url: str, headers: dict, work_ms: int) -> tuple[float, str]:
+    """Run one user session and return (latency_seconds, upstream_worker)."""
+    start = time.perf_counter()
+
+    cookie, upstream = await asyncio.to_thread(_load_page, f"{base_url}/", headers)
+
+    ws_url = base_url.replace("http", "ws", 1) + "/_stcore/stream"
+    ws_headers = dict(headers, Cookie=cookie) if cookie else headers
+    async with websockets.connect(
+        ws_url, additional_headers=ws_headers, subprotocols=["streamlit"], max_size=None, open_timeout=120
+    ) as conn:
+        msg = BackMsg()
+        msg.rerun_script.query_string = f"loadtest={work_ms}"
+        msg.rerun_script.widget_states.SetInParent()
+        await conn.send(msg.SerializeToString())
+
+        async for raw in conn:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            if fwd.WhichOneof("type") == "script_finished":
+                break
+        else:
+            raise RuntimeError("websocket closed before the script finished")
+    return time.perf_counter() - start, upstream
+
+
+async def run_level(base_url: str, headers: dict, concurrency: int, sessions: int, work_ms: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            return await _session(base_url, headers, work_ms)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(r[0] for r in results)
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "sessions_per_s": sessions / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000,
+        "workers": Counter(r[1] for r in results),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--user", default=None)
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--sessions", type=int, default=48, help="Sessions per concurrency level")
+    parser.add_argument("--work-ms", type=int, default=250, help="Blocking work per script run")
+    args = parser.parse_args()
+
+    headers = {}
+    if args.user:
+        token = base64.b64encode(f"{args.user}:{args.password or ''}".encode()).decode()
+        headers["Authorization"] = f"Basic {token}"
+
+    base_url = args.url.rstrip("/")
+    print(f"{'conc':>5} {'sessions':>9} {'sess/s':>8} {'p50 ms':>8} {'p95 ms':>8}   workers")
+    baseline = None
+    for level in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+        r = await run_level(base_url, headers, level, args.sessions, args.work_ms)
+        baseline = baseline or r["sessions_per_s"]
+        spread = ", ".join(f"{worker}={n}" for worker, n in sorted(r["workers"].items()))
+        print(
+            f"{r['concurrency']:>5} {r['sessions']:>9} {r['sessions_per_s']:>8.2f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}   {spread}"
+            f"   (x{r['sessions_per_s'] / baseline:.2f} vs first level)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+import pytest
+
+from utils.document_model import HEADING, PARAGRAPH, Block, DocumentModel, _pdf_heading_level
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "2013 The Navy decided that the carrier tests would",
+        "February 4, 2011",
+        "Captain Jaime Engdahl",
+        "Los Angeles Times",
+        "NATO",
+        "The program was delayed.",
+        "part of the reason the program slipped was",
+        "Section 2 of the contract required that",
+        "Attachment of the tailhook to the",
+        "chapter and verse on the schedule",
+    ],
+)
+def test_pdf_body_lines_are_not_headings(line):
+    assert _pdf_heading_level(line) is None
+
+
+@pytest.mark.parametrize(
+    "line, level",
+    [
+        ("1 Introduction", 1),
+        ("2.1 Background", 2),
+        ("3.2.1) Cost Overruns", 3),
+        ("Exhibit 3", 2),
+        ("Appendix A Timeline", 2),
+        ("Part IV", 2),
+        ("Exhibit 2: Cost Growth", 2),
+        ("CASE STUDY OVERVIEW", 1),
+    ],
+)
+def test_pdf_headings(line, level):
+    assert _pdf_heading_level(line) == level
+
+
+def _model(titles, styled=False):
+    blocks = [Block(HEADING, t, 1, 1) for t in titles] + [Block(PARAGRAPH, "Body text.")]
+    return DocumentModel(blocks, styled_headings=styled)
+
+
+def test_docx_styled_headings_give_outline():
+    outline = _model(["Background", "Decision"], styled=True).trusted_outline_text()
+    assert outline == "- Background (p. 1)\n- Decision (p. 1)"
+
+
+def test_pdf_outline_needs_numbered_headings():
+    assert _model(["CASE OVERVIEW", "1 Background", "2 Decision"]).trusted_outline_text() == ""
+    titles = ["CASE OVERVIEW"] + [f"{i} Section {i}" for i in range(1, 6)]
+    outline = _model(titles).trusted_outline_text()
+    assert "CASE OVERVIEW" not in outline
+    assert outline.count("\n") == 4
+
+
+@pytest.mark.parametrize(
+    "titles",
+    [
+        ["1 Background", "2 Program", "12 Navy officers briefed the program", "3 Decision", "4 Outcome"],
+        ["1 Background", "2 Program", "2 Program", "3 Decision", "4 Outcome"],
+        ["1 Background", "2 Program", "3 Decision", "9 Outcome", "10 Lessons"],
+        ["1 Background", "2 Program", "Exhibit 1", "Exhibit 1", "3 Decision"],
+    ],
+)
+def test_pdf_outline_needs_consistent_numbering(titles):
+    assert _model(titles).trusted_outline_text() == ""
+
+
+def test_pdf_outline_accepts_nested_numbering():
+    titles = ["1 Background", "1.1 Program", "1.2 Budget", "2 Decision", "2.1 Options", "Exhibit 1", "4 Outcome"]
+    assert _model(titles).trusted_outline_text().count("\n") == 6
+
+
+def test_docx_table_keeps_equal_cells_and_merges_spans(tmp_path):
+    docx = pytest.importorskip("docx")
+    from utils.document_model import TABLE, extract_document
+
+    document = docx.Document()
+    table = document.add_table(rows=2, cols=3)
+    for cell, text in zip(table.rows[0].cells, ["FY12", "0.97", "0.97"]):
+        cell.text = text
+    merged = table.cell(1, 0).merge(table.cell(1, 1))
+    merged.text = "Total"
+    table.cell(1, 2).text = "1.94"
+    path = str(tmp_path / "table.docx")
+    document.save(path)
+
+    (block,) = [b for b in extract_document(path).blocks if b.kind == TABLE]
+    assert block.rows == [["FY12", "0.97", "0.97"], ["Total", "1.94"]]
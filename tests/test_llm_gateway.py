@@ -0,0 +1,92 @@
+import sys
+import types
+
+import pytest
+
+from utils import llm_gateway
+from utils.llm_gateway import LLMGateway, TokenBucket, gate_llm
+
+
+@pytest.mark.parametrize("per_minute, capacity, amount", [(600, 100, 40), (600, 100, 250), (60, 0.5, 1)])
+def test_token_bucket_long_run_rate_matches_limit(per_minute, capacity, amount):
+    bucket = TokenBucket(per_minute, capacity)
+    start = now = bucket.updated
+    admitted = 0
+    for _ in range(500):
+        now += bucket.wait_time(amount, now)
+        bucket.consume(amount, now)
+        admitted += amount
+    # Time until the next charge is admitted; only the initial burst is above the rate
+    minutes = (now + bucket.wait_time(amount, now) - start) / 60
+    assert admitted - capacity <= per_minute * minutes * 1.001
+    assert admitted >= per_minute * minutes * 0.999
+
+
+class _RateLimitError(Exception):
+    status_code = 429
+    response = None
+
+
+class _StubLLM:
+    """Shaped like crewai's LLM: `call` is a method, extra kwargs go to litellm."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.max_tokens = 100
+        self.max_retries = 2
+        self.additional_params = {}
+        self.calls = 0
+
+    def __setattr__(self, name, value):
+        # Pydantic-style models reject unknown attributes such as `call`
+        if name == "call" and "call" not in type(self).__dict__:
+            raise ValueError(name)
+        super().__setattr__(name, value)
+
+    def call(self, messages, callbacks=None):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gw = LLMGateway()
+    monkeypatch.setattr(llm_gateway, "_gateway", gw)
+    monkeypatch.setattr(llm_gateway, "BACKOFF_BASE_SECONDS", 0.01)
+    return gw
+
+
+def test_gate_llm_routes_calls_through_gateway(gateway):
+    llm = gate_llm(_StubLLM([_RateLimitError(), "case"]))
+
+    assert llm.call([{"role": "user", "content": "hi"}]) == "case"
+    assert llm.calls == 2
+    assert gateway.metrics()["requests"] == 2
+    assert gateway.metrics()["rate_limited"] == 1
+    # Retries are left to the gateway
+    assert llm.max_retries == 0
+    assert llm.additional_params == {"num_retries": 0, "max_retries": 0}
+    # Wrapping twice does not stack gateways
+    assert gate_llm(llm) is llm
+    llm.responses.append("again")
+    llm.call("hi")
+    assert gateway.metrics()["requests"] == 3
+
+
+def test_litellm_hook_feeds_headers_to_gateway(gateway, monkeypatch):
+    fake_litellm = types.SimpleNamespace(success_callback=[])
+    monkeypatch.setitem(sys.modules, "litellm", fake_litellm)
+    monkeypatch.setattr(llm_gateway, "_hooks_installed", False)
+
+    gate_llm(_StubLLM([]))
+    gate_llm(_StubLLM([]))
+    (observe,) = fake_litellm.success_callback
+
+    response = types.SimpleNamespace(
+        _hidden_params={"additional_headers": {"llm_provider-retry-after-ms": "5000"}}
+    )
+    observe({}, response, None, None)
+    assert gateway.metrics()["paused_for_s"] > 4
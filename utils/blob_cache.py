@@ -0,0 +1,100 @@
+# utils/blob_cache.py
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-process lock, writes stay atomic
+    fcntl = None
+
+
+@lru_cache(maxsize=4)
+def get_blob_service_client(connection_string: str):
+    """
+    Return a process-wide BlobServiceClient for a connection string.
+
+    The Azure SDK is imported on first use, and the client (with its HTTP
+    connection pool) is reused across requests instead of rebuilt per call.
+    """
+    from azure.storage.blob import BlobServiceClient
+
+    return BlobServiceClient.from_connection_string(connection_string)
+
+
+def cache_dir() -> str:
+    """
+    Directory shared by all Streamlit workers in the container (CASE_CACHE_DIR).
+    """
+    path = os.getenv("CASE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "case-cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextmanager
+def _file_lock(path: str):
+    with open(path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def download_blob_cached(blob_path: str) -> str:
+    """
+    Download a blob once into the shared cache directory and return its path.
+
+    The cached copy is keyed on the blob's ETag, so a re-uploaded blob is
+    fetched again while unchanged blobs are served from disk. A per-blob file
+    lock stops several workers from downloading the same blob at once.
+
+    Args:
+        blob_path: Path of the blob within AZURE_CONTAINER_NAME.
+
+    Returns:
+        Local path of the cached file. Callers must treat it as read-only.
+    """
+    connection_string = os.environ["AZURE_STORAGE_CONNECTION_STRING"]
+    container_name = os.environ["AZURE_CONTAINER_NAME"]
+
+    blob_service_client = get_blob_service_client(connection_string)
+    blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
+    etag = blob_client.get_blob_properties().etag.strip('"')
+
+    _, ext = os.path.splitext(os.path.basename(blob_path))
+    key = hashlib.sha256(f"{container_name}/{blob_path}".encode("utf-8")).hexdigest()[:16]
+    base = os.path.join(cache_dir(), key)
+    local_path = f"{base}-{etag}{ext}"
+
+    if os.path.exists(local_path):
+        print(f"[📦] Cache hit: {blob_path}")
+        return local_path
+
+    with _file_lock(f"{base}.lock"):
+        # Another worker may have finished the download while we waited
+        if os.path.exists(local_path):
+            print(f"[📦] Cache hit: {blob_path}")
+            return local_path
+
+        print(f"[⏬] Downloading blob to cache: {blob_path}")
+        fd, tmp_path = tempfile.mkstemp(suffix=ext, dir=os.path.dirname(base))
+        with os.fdopen(fd, "wb") as f:
+            blob_client.download_blob().readinto(f)
+        os.replace(tmp_path, local_path)
+
+        # Drop copies of older versions of this blob
+        for name in os.listdir(os.path.dirname(base)):
+            stale = os.path.join(os.path.dirname(base), name)
+            if name.startswith(f"{key}-") and stale != local_path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    print(f"[✅] Blob cached: {local_path}")
+    return local_path
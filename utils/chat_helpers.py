@@ -3,6 +3,7 @@ import streamlit as st
 from fpdf import FPDF
 import tempfile
 import base64
+import re
 
 def display_conversation(conversation):
     """
@@ -35,25 +36,33 @@ def download_as_pdf(text, title="Generated_Case"):
         href = f'<a href="data:application/octet-stream;base64,{b64}" download="{title}.pdf">📥 Download Case as PDF</a>'
         st.markdown(href, unsafe_allow_html=True)
 
+# Small-talk phrases and their canned replies. The matcher below is compiled
+# once at import time and only fires when the whole prompt is small talk, so
+# "hi" no longer matches inside words like "this" or "history".
+FRIENDLY_RESPONSES = {
+    "hello": "Hi there! 😊 What would you like to do today?",
+    "hi": "Hello! 👋 Ready to generate a case?",
+    "hey": "Hey! How can I help you today?",
+    "how are you": "I'm doing great, thanks for asking! 😊",
+    "thank you": "You're very welcome! 🙌",
+    "thanks": "Anytime! 😊",
+    "bye": "Goodbye! 👋 Have a great day!",
+}
+
+_FRIENDLY_PATTERN = re.compile(
+    r"^\W*(?P<phrase>"
+    + "|".join(re.escape(k).replace(r"\ ", r"\s+") for k in sorted(FRIENDLY_RESPONSES, key=len, reverse=True))
+    + r")\b(?:\s+there|\s+all|\s+so\s+much|\s+a\s+lot)?[\s!.?,😊🙂👋🙏]*$",
+    flags=re.IGNORECASE,
+)
+
 def get_friendly_response(prompt: str) -> str | None:
     """
     Simple rule-based response for basic greetings or small talk.
     Returns None if the message is not a friendly small-talk message.
     """
-    p = prompt.lower().strip()
-
-    responses = {
-        "hello": "Hi there! 😊 What would you like to do today?",
-        "hi": "Hello! 👋 Ready to generate a case?",
-        "hey": "Hey! How can I help you today?",
-        "how are you": "I'm doing great, thanks for asking! 😊",
-        "thank you": "You're very welcome! 🙌",
-        "thanks": "Anytime! 😊",
-        "bye": "Goodbye! 👋 Have a great day!",
-    }
-
-    for key in responses:
-        if key in p:
-            return responses[key]
-
-    return None
+    m = _FRIENDLY_PATTERN.match(prompt or "")
+    if not m:
+        return None
+    phrase = re.sub(r"\s+", " ", m.group("phrase").lower())
+    return FRIENDLY_RESPONSES[phrase]
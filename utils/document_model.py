@@ -0,0 +1,303 @@
+# utils/document_model.py
+"""
+Structure-aware text extraction for PDF and DOCX files.
+
+Instead of flattening a document into one string, `extract_document` returns a
+light document model: an ordered list of headings (with levels), paragraphs
+and tables, each tagged with its page number. The model renders to a compact
+markdown-like text for the LLM and exposes a section outline that can be
+handed to the writer directly instead of asking a planner to rediscover it.
+
+PDF headings are guessed from the text, so only DOCX heading styles, or a
+PDF with enough numbered/labelled headings, yield such an outline
+(`trusted_outline_text`).
+"""
+import io
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+HEADING = "heading"
+PARAGRAPH = "paragraph"
+TABLE = "table"
+
+# An outline replaces the planner only with at least this many headings from
+# DOCX heading styles, or numbered/labelled headings in a PDF
+MIN_STYLED_OUTLINE_HEADINGS = 2
+MIN_PDF_OUTLINE_HEADINGS = 5
+
+# Largest step allowed between consecutive PDF section numbers (tolerates one
+# heading the extractor missed)
+MAX_SECTION_STEP = 2
+
+# PDF heading heuristics. Section numbers have at most two digits per part,
+# so body lines starting with a year ("2013 The Navy ...") do not match.
+# Labels need a capital, one identifier (number, letter or roman numeral)
+# and optionally a capitalized title: "Exhibit 3", "Appendix A Timeline".
+_NUMBERED_HEADING_RE = re.compile(r"^(?P<num>\d{1,2}(?:\.\d{1,2})*)[.)]?\s+(?P<title>[A-Z].*)$")
+_LABEL_HEADING_RE = re.compile(
+    r"^(?P<label>Exhibit|Appendix|Annex|Attachment|Part|Chapter|Section)\s+"
+    r"(?P<id>\d+(?:\.\d+)*|[A-Z]|[IVXLC]+)[.:)]?(?:\s+(?:[-–—]\s+)?[A-Z].*)?$"
+)
+_DOCX_HEADING_RE = re.compile(r"^Heading\s*(\d)$", re.IGNORECASE)
+
+
+@dataclass
+class Block:
+    """
+    One unit of document content.
+
+    Attributes:
+        kind: HEADING, PARAGRAPH or TABLE.
+        text: Heading or paragraph text; empty for tables.
+        page: 1-based page number the block starts on.
+        level: Heading level (1 = top level); 0 for other blocks.
+        rows: Table cells as a list of rows; empty for other blocks.
+    """
+    kind: str
+    text: str = ""
+    page: int = 1
+    level: int = 0
+    rows: list = field(default_factory=list)
+
+
+@dataclass
+class DocumentModel:
+    """
+    Ordered blocks of a document plus helpers to render them.
+
+    Attributes:
+        blocks: The Block objects in reading order.
+        styled_headings: True when headings come from the file's own heading
+            styles (DOCX) rather than text heuristics (PDF).
+    """
+    blocks: list = field(default_factory=list)
+    styled_headings: bool = False
+
+    def headings(self) -> list:
+        return [b for b in self.blocks if b.kind == HEADING]
+
+    def outline(self) -> list:
+        """Return the section outline as (level, title, page) tuples."""
+        return [(b.level, b.text, b.page) for b in self.headings()]
+
+    def outline_text(self) -> str:
+        """Render the outline as an indented bullet list, one heading per line."""
+        return "\n".join(
+            f"{'  ' * (level - 1)}- {title} (p. {page})" for level, title, page in self.outline()
+        )
+
+    def trusted_outline_text(self) -> str:
+        """
+        Render the outline with `outline_text` when it is reliable enough to
+        replace the planner, otherwise return "". PDFs only count numbered or
+        labelled headings ("2.1 Background", "Exhibit 3"), need more of them,
+        and their numbering must be consistent (see `_numbering_is_consistent`).
+        """
+        if self.styled_headings:
+            outline = DocumentModel(self.headings())
+            minimum = MIN_STYLED_OUTLINE_HEADINGS
+        else:
+            outline = DocumentModel([h for h in self.headings() if _is_numbered_heading(h.text)])
+            minimum = MIN_PDF_OUTLINE_HEADINGS
+            if not _numbering_is_consistent(outline.headings()):
+                return ""
+        return outline.outline_text() if len(outline.blocks) >= minimum else ""
+
+    def write_text(self, out) -> None:
+        """
+        Stream the document to a text file-like object as compact markdown:
+        `#` headings, plain paragraphs and pipe tables, one block per line.
+        """
+        first = True
+        for b in self.blocks:
+            if b.kind == TABLE:
+                lines = ("| " + " | ".join(row) + " |" for row in b.rows)
+            elif b.kind == HEADING:
+                lines = (f"{'#' * min(b.level, 6)} {b.text}",)
+            else:
+                lines = (b.text,)
+            for line in lines:
+                if not first:
+                    out.write("\n")
+                out.write(line)
+                first = False
+
+    def to_text(self) -> str:
+        """Render the document with `write_text` and return it as a string."""
+        out = io.StringIO()
+        self.write_text(out)
+        return out.getvalue()
+
+
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _is_numbered_heading(text: str) -> bool:
+    return bool(_NUMBERED_HEADING_RE.match(text) or _LABEL_HEADING_RE.match(text))
+
+
+def _numbering_is_consistent(headings: list) -> bool:
+    """
+    Check that numbered headings read like a real outline: each number follows
+    the previous one as its next sibling, first child or a later parent
+    section, never repeating or jumping by more than MAX_SECTION_STEP. Labels
+    ("Exhibit 3") may not repeat. A number-led body line ("12 Navy officers
+    briefed ...") breaks the sequence.
+    """
+    prev = ()
+    labels = set()
+    for h in headings:
+        m = _NUMBERED_HEADING_RE.match(h.text)
+        if not m:
+            label = _LABEL_HEADING_RE.match(h.text)
+            key = (label.group("label"), label.group("id"))
+            if key in labels:
+                return False
+            labels.add(key)
+            continue
+        num = tuple(int(n) for n in m.group("num").split("."))
+        # Compare against the previous number cut or zero-padded to this depth
+        base = (prev + (0,) * len(num))[: len(num)]
+        if not any(
+            num[:k] == base[:k]
+            and 0 < num[k] - base[k] <= MAX_SECTION_STEP
+            and all(n == 1 for n in num[k + 1:])
+            for k in range(len(num))
+        ):
+            return False
+        prev = num
+    return True
+
+
+def _pdf_heading_level(line: str) -> Optional[int]:
+    """
+    Guess whether a PDF text line is a heading and return its level.
+
+    Only numbered ("2.1 Background"), labelled ("Exhibit 3") and all-caps
+    lines count. Title-case lines are left as body text: dates, names and
+    bylines ("February 4, 2011", "Los Angeles Times") look the same.
+    """
+    if not 3 <= len(line) <= 90 or line[-1] in ".,;:" or len(line.split()) > 12:
+        return None
+    m = _NUMBERED_HEADING_RE.match(line)
+    if m:
+        return m.group("num").count(".") + 1
+    if _LABEL_HEADING_RE.match(line):
+        return 2
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 4 and len(line.split()) >= 2 and all(c.isupper() for c in letters):
+        return 1
+    return None
+
+
+def _extract_pdf(file_path: str) -> DocumentModel:
+    from PyPDF2 import PdfReader
+
+    with open(file_path, "rb") as f:
+        reader = PdfReader(f)
+        pages = [(p.extract_text() or "").splitlines() for p in reader.pages]
+
+    # Running headers/footers repeat on most pages; drop them
+    repeated = set()
+    if len(pages) >= 3:
+        counts = Counter(line.strip() for lines in pages for line in set(lines) if line.strip())
+        repeated = {line for line, n in counts.items() if n >= 0.6 * len(pages) and len(line) <= 90}
+
+    doc = DocumentModel()
+    for page_no, lines in enumerate(pages, start=1):
+        para = []
+        for raw in lines:
+            line = raw.strip()
+            if line in repeated:
+                continue
+            level = _pdf_heading_level(line) if line else None
+            if not line or level:
+                if para:
+                    doc.blocks.append(Block(PARAGRAPH, _clean(" ".join(para)), page_no))
+                    para = []
+                if level:
+                    doc.blocks.append(Block(HEADING, _clean(line), page_no, level))
+                continue
+            para.append(line)
+        if para:
+            doc.blocks.append(Block(PARAGRAPH, _clean(" ".join(para)), page_no))
+    return doc
+
+
+def _docx_heading_level(paragraph) -> Optional[int]:
+    name = paragraph.style.name if paragraph.style is not None else ""
+    if name == "Title":
+        return 1
+    m = _DOCX_HEADING_RE.match(name or "")
+    return int(m.group(1)) if m else None
+
+
+def _extract_docx(file_path: str) -> DocumentModel:
+    from docx import Document
+    from docx.table import Table
+
+    doc = DocumentModel(styled_headings=True)
+    page_no = 1
+    for item in Document(file_path).iter_inner_content():
+        if isinstance(item, Table):
+            rows = []
+            for row in item.rows:
+                cells = []
+                prev = None
+                for cell in row.cells:
+                    # A merged cell is repeated by python-docx with the same
+                    # underlying <w:tc>; keep one copy. Equal text in distinct
+                    # cells ("FY12 | 0.97 | 0.97") is kept.
+                    if prev is not None and cell._tc is prev._tc:
+                        continue
+                    prev = cell
+                    cells.append(_clean(cell.text))
+                if any(cells):
+                    rows.append(cells)
+            if rows:
+                doc.blocks.append(Block(TABLE, page=page_no, rows=rows))
+            continue
+
+        text = _clean(item.text)
+        if text:
+            level = _docx_heading_level(item)
+            if level:
+                doc.blocks.append(Block(HEADING, text, page_no, level))
+            else:
+                doc.blocks.append(Block(PARAGRAPH, text, page_no))
+        # Page numbers follow the page breaks Word recorded in the file
+        if item.contains_page_break or item._p.xpath('./w:r/w:br[@w:type="page"]'):
+            page_no += 1
+    return doc
+
+
+def extract_document(file_path: str) -> DocumentModel:
+    """
+    Extract a PDF or DOCX file into a DocumentModel.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    if file_path.endswith(".pdf"):
+        doc = _extract_pdf(file_path)
+    elif file_path.endswith(".docx"):
+        doc = _extract_docx(file_path)
+    else:
+        raise ValueError("Unsupported file type")
+    print(f"[📑] Extracted {len(doc.blocks)} blocks, {len(doc.headings())} headings: {file_path}")
+    return doc
+
+
+def join_guide_and_upload(guide_text: str, user_doc: DocumentModel) -> str:
+    """
+    Build the combined source text (guide, separator, uploaded document) in a
+    single buffer, without first rendering the upload to its own string.
+    """
+    out = io.StringIO()
+    out.write(guide_text)
+    out.write("\n\n---\n\nAdditional Context from Uploaded File:\n\n")
+    user_doc.write_text(out)
+    return out.getvalue()
@@ -0,0 +1,365 @@
+# utils/llm_gateway.py
+"""
+Process-wide gateway for Azure OpenAI calls made by the agents.
+
+Every LLM call goes through one `LLMGateway` per worker process, which
+- limits requests and tokens per minute with token buckets,
+- caps the number of requests in flight,
+- admits interactive work ahead of batch work,
+- pauses on 429s and rate-limit headers (retry-after, x-ratelimit-*), and
+  shrinks the in-flight window on 429s, growing it back on success.
+
+Limits come from LLM_RPM, LLM_TPM and LLM_MAX_IN_FLIGHT (0 = unlimited).
+They apply per process, so with STREAMLIT_WORKERS=N set them to the
+deployment quota divided by N.
+"""
+import heapq
+import itertools
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+# Completion budget assumed per call when the LLM has no max_tokens set
+DEFAULT_COMPLETION_TOKENS = 1024
+
+# Azure enforces per-minute quotas over short windows, so bursts are limited
+# to what the rate allows in this many seconds
+BURST_SECONDS = 10.0
+
+# Backoff used on a 429 without a retry-after header
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` units per minute.
+    A rate of 0 or less means unlimited.
+
+    A charge larger than the capacity waits for a full bucket, is then
+    charged in full and leaves the level negative, so the long-run rate
+    never exceeds `per_minute` however large single charges are.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def consume(self, amount: float, now: float) -> None:
+        if self.rate <= 0:
+            return
+        self._refill(now)
+        self.level -= amount
+
+
+def _parse_duration(value) -> Optional[float]:
+    """Parse '20', '1.5', '20ms', '6m0s' style values into seconds."""
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(text)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def _normalize_headers(headers) -> dict:
+    # litellm prefixes provider headers with "llm_provider-"
+    if not headers:
+        return {}
+    return {str(k).lower().replace("llm_provider-", ""): v for k, v in dict(headers).items()}
+
+
+def parse_rate_limit_headers(headers) -> dict:
+    """
+    Extract the rate-limit signals from response headers.
+
+    Returns:
+        A dict with any of `retry_after`, `remaining_requests`,
+        `remaining_tokens`, `reset_requests` and `reset_tokens` (seconds or counts).
+    """
+    h = _normalize_headers(headers)
+    out = {}
+    if "retry-after-ms" in h:
+        out["retry_after"] = float(h["retry-after-ms"]) / 1000.0
+    elif "retry-after" in h:
+        retry_after = _parse_duration(h["retry-after"])
+        if retry_after is not None:
+            out["retry_after"] = retry_after
+    for key in ("remaining-requests", "remaining-tokens"):
+        if f"x-ratelimit-{key}" in h:
+            try:
+                out[key.replace("-", "_")] = int(float(h[f"x-ratelimit-{key}"]))
+            except ValueError:
+                pass
+    for key in ("reset-requests", "reset-tokens"):
+        reset = _parse_duration(h.get(f"x-ratelimit-{key}"))
+        if reset is not None:
+            out[key.replace("-", "_")] = reset
+    return out
+
+
+def _is_rate_limit_error(exc: Exception) -> bool:
+    return getattr(exc, "status_code", None) == 429 or "RateLimit" in type(exc).__name__
+
+
+def _error_headers(exc: Exception):
+    headers = getattr(exc, "litellm_response_headers", None)
+    if headers is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+    return headers
+
+
+class LLMGateway:
+    """
+    Admission control for LLM calls: rate limits, in-flight cap, priorities
+    and adaptive backoff. Safe to share between threads.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, max_in_flight: int = 0, burst_seconds: float = BURST_SECONDS):
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._requests = TokenBucket(rpm, rpm * burst_seconds / 60.0)
+        self._tokens = TokenBucket(tpm, tpm * burst_seconds / 60.0)
+        self._max_in_flight = max_in_flight if max_in_flight > 0 else math.inf
+        self._window = self._max_in_flight
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._consecutive_429 = 0
+        self._waits = deque(maxlen=500)
+        self._counters = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    # ---------- Admission ----------
+    def _admission_delay(self, ticket, tokens: int, now: float) -> float:
+        if self._queue[0] != ticket or self._in_flight >= self._window:
+            return math.inf
+        return max(
+            self._paused_until - now,
+            self._requests.wait_time(1, now),
+            self._tokens.wait_time(tokens, now),
+            0.0,
+        )
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_INTERACTIVE, tokens: int = 0):
+        """
+        Block until a call may start, then hold an in-flight slot.
+        Lower `priority` values are admitted first; ties are FIFO.
+        """
+        start = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._admission_delay(ticket, tokens, now)
+                    if delay <= 0:
+                        break
+                    self._cond.wait(None if delay == math.inf else delay)
+            except BaseException:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            self._requests.consume(1, now)
+            self._tokens.consume(tokens, now)
+            self._counters["requests"] += 1
+            self._waits.append(now - start)
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    # ---------- Feedback ----------
+    def observe_headers(self, headers) -> None:
+        """Pause admissions when the API reports an exhausted quota."""
+        info = parse_rate_limit_headers(headers)
+        pause = info.get("retry_after", 0.0)
+        if info.get("remaining_requests") == 0:
+            pause = max(pause, info.get("reset_requests", 0.0))
+        if info.get("remaining_tokens") == 0:
+            pause = max(pause, info.get("reset_tokens", 0.0))
+        if pause > 0:
+            with self._cond:
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+                self._cond.notify_all()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._consecutive_429 = 0
+            if self._window < self._max_in_flight:
+                self._window += 1
+                self._cond.notify_all()
+
+    def on_rate_limited(self, headers=None) -> float:
+        """
+        Record a 429: pause for retry-after (or exponential backoff with
+        jitter) and halve the in-flight window. Returns the pause in seconds.
+        """
+        retry_after = parse_rate_limit_headers(headers).get("retry_after")
+        with self._cond:
+            self._consecutive_429 += 1
+            self._counters["rate_limited"] += 1
+            if retry_after is None:
+                retry_after = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (self._consecutive_429 - 1))
+                retry_after *= random.uniform(0.8, 1.2)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            busy = self._in_flight if self._window == math.inf else self._window
+            self._window = max(1, busy // 2)
+            self._cond.notify_all()
+        return retry_after
+
+    # ---------- Calls ----------
+    def call(self, fn: Callable, *, priority: int = PRIORITY_INTERACTIVE, tokens: int = 0, max_retries: int = 5):
+        """
+        Run `fn()` under the gateway, retrying rate-limit errors up to
+        `max_retries` times after the backoff the API asked for.
+        """
+        for attempt in range(max_retries + 1):
+            with self.slot(priority, tokens):
+                try:
+                    result = fn()
+                except Exception as e:
+                    if not _is_rate_limit_error(e) or attempt == max_retries:
+                        with self._cond:
+                            self._counters["errors"] += 1
+                        raise
+                    pause = self.on_rate_limited(_error_headers(e))
+                    print(f"[🚦] Rate limited, retrying in {pause:.1f}s (attempt {attempt + 1}/{max_retries})")
+                    continue
+            self.on_success()
+            return result
+
+    def metrics(self) -> dict:
+        """Queue depth, in-flight count and admission wait times (ms) for this process."""
+        with self._cond:
+            waits = sorted(self._waits)
+            out = dict(self._counters)
+            out.update(
+                queue_depth=len(self._queue),
+                in_flight=self._in_flight,
+                in_flight_limit=None if self._window == math.inf else self._window,
+                paused_for_s=round(max(0.0, self._paused_until - time.monotonic()), 3),
+            )
+        if waits:
+            out["wait_ms_avg"] = round(sum(waits) / len(waits) * 1000, 1)
+            out["wait_ms_p95"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1)
+            out["wait_ms_max"] = round(waits[-1] * 1000, 1)
+        return out
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+_hooks_lock = threading.Lock()
+_hooks_installed = False
+
+
+def get_gateway() -> LLMGateway:
+    """Return the process-wide gateway, configured from the environment on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(
+                rpm=float(os.getenv("LLM_RPM", "0")),
+                tpm=float(os.getenv("LLM_TPM", "0")),
+                max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "4")),
+            )
+        return _gateway
+
+
+def estimate_tokens(messages) -> int:
+    """Rough prompt size: about four characters per token."""
+    if isinstance(messages, str):
+        return len(messages) // 4 + 1
+    return sum(len(str(m.get("content", "")) if isinstance(m, dict) else str(m)) for m in messages or []) // 4 + 1
+
+
+def _install_litellm_hooks() -> None:
+    """Feed rate-limit headers from successful litellm responses into the gateway."""
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        try:
+            import litellm
+        except ImportError:
+            return
+
+        def _observe(kwargs, completion_response, start_time, end_time):
+            hidden = getattr(completion_response, "_hidden_params", None) or {}
+            get_gateway().observe_headers(hidden.get("additional_headers"))
+
+        litellm.success_callback.append(_observe)
+        _hooks_installed = True
+
+
+def _disable_client_retries(llm) -> None:
+    # litellm and the openai client retry 429s on their own, out of the
+    # gateway's sight; the gateway does all retries instead
+    params = getattr(llm, "additional_params", None)
+    if isinstance(params, dict):
+        # crewai's LLM passes these through to litellm.completion
+        params.update(num_retries=0, max_retries=0)
+    for name in ("num_retries", "max_retries"):
+        if hasattr(llm, name):
+            object.__setattr__(llm, name, 0)
+
+
+def gate_llm(llm, priority: int = PRIORITY_INTERACTIVE):
+    """
+    Route an LLM object's `call` through the process-wide gateway, with the
+    client's own retries turned off. Returns the same object, so it can wrap
+    `LLM(...)` in place.
+    """
+    original = llm.call
+    if getattr(original, "_gated", False):
+        return llm
+    gateway = get_gateway()
+    _disable_client_retries(llm)
+
+    def call(messages, *args, **kwargs):
+        tokens = estimate_tokens(messages) + (getattr(llm, "max_tokens", None) or DEFAULT_COMPLETION_TOKENS)
+        return gateway.call(lambda: original(messages, *args, **kwargs), priority=priority, tokens=tokens)
+
+    call._gated = True
+    # Instance attribute shadows the class method; bypasses pydantic-style setattr checks
+    object.__setattr__(llm, "call", call)
+    _install_litellm_hooks()
+    return llm
@@ -0,0 +1,147 @@
+# utils/request_router.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from utils.chat_helpers import get_friendly_response
+from utils.result_store import get_result, request_too_large
+
+# Routes a "Generate Case" click can take. Only ROUTE_GENERATE reaches Azure
+# (blob upload, guide download and the agent crew); the rest are answered locally.
+ROUTE_GENERATE = "generate"
+ROUTE_SMALL_TALK = "small_talk"
+ROUTE_MISSING_INPUT = "missing_input"
+ROUTE_DUPLICATE = "duplicate"
+ROUTE_REJECTED = "rejected"
+
+# How long, and how many, recent requests are remembered for duplicate detection.
+# Only result ids are kept here; the case text lives in utils.result_store.
+RECENT_TTL_SECONDS = 15 * 60
+RECENT_MAX_ENTRIES = 32
+
+_lock = threading.Lock()
+_recent: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+_stats = {ROUTE_GENERATE: 0, ROUTE_SMALL_TALK: 0, ROUTE_MISSING_INPUT: 0, ROUTE_DUPLICATE: 0, ROUTE_REJECTED: 0}
+
+
+@dataclass
+class RouteDecision:
+    """
+    Outcome of routing a request.
+
+    Attributes:
+        route: One of the ROUTE_* constants.
+        response: Text to show the user when the request is answered locally,
+            or None for ROUTE_GENERATE.
+        key: Fingerprint of the session, prompt and upload; pass it to `remember_result`
+            once a generated case is available.
+        result_id: For ROUTE_DUPLICATE, the stored result being reused.
+    """
+    route: str
+    response: Optional[str] = None
+    key: Optional[str] = None
+    result_id: Optional[str] = None
+
+
+def _request_key(prompt: str, uploaded_file, session_id: str) -> str:
+    h = hashlib.sha256(session_id.encode("utf-8"))
+    h.update(b"\0")
+    h.update(" ".join(prompt.lower().split()).encode("utf-8"))
+    if uploaded_file is not None:
+        h.update(b"\0")
+        # Hash the upload buffer in place rather than copying it
+        with uploaded_file.getbuffer() as view:
+            h.update(view)
+    return h.hexdigest()
+
+
+def _record(route: str) -> None:
+    with _lock:
+        _stats[route] += 1
+
+
+def route_request(
+    prompt: Optional[str],
+    uploaded_file=None,
+    session_id: str = "",
+    regenerate: bool = False,
+) -> RouteDecision:
+    """
+    Classify a request before any blob or LLM work is done.
+
+    Args:
+        prompt: The text entered by the user.
+        uploaded_file: The Streamlit upload, if any.
+        session_id: Scopes duplicate detection, so a session is only ever
+            shown its own earlier cases.
+        regenerate: Skip duplicate detection and always generate a new case.
+
+    Returns:
+        A RouteDecision. Anything other than ROUTE_GENERATE carries a ready
+        response; small talk and duplicates count as avoided LLM runs.
+    """
+    prompt = (prompt or "").strip()
+
+    if not prompt:
+        _record(ROUTE_MISSING_INPUT)
+        if uploaded_file is None:
+            return RouteDecision(ROUTE_MISSING_INPUT, "⚠️ Please enter a prompt or upload a file before generating the case.")
+        return RouteDecision(ROUTE_MISSING_INPUT, "⚠️ Prompt required for generating a case from the file.")
+
+    if uploaded_file is not None:
+        rejection = request_too_large(uploaded_file.size)
+        if rejection:
+            _record(ROUTE_REJECTED)
+            return RouteDecision(ROUTE_REJECTED, rejection)
+
+    if uploaded_file is None:
+        friendly = get_friendly_response(prompt)
+        if friendly:
+            _record(ROUTE_SMALL_TALK)
+            return RouteDecision(ROUTE_SMALL_TALK, friendly)
+
+    key = _request_key(prompt, uploaded_file, session_id)
+    now = time.monotonic()
+    with _lock:
+        hit = None if regenerate else _recent.get(key)
+        if hit and now - hit[0] > RECENT_TTL_SECONDS:
+            hit = None
+        elif hit:
+            _recent.move_to_end(key)
+    # The result may have been evicted from the store since it was remembered
+    cached = get_result(hit[1]) if hit else None
+    if cached is not None:
+        _record(ROUTE_DUPLICATE)
+        return RouteDecision(ROUTE_DUPLICATE, cached, key, hit[1])
+    _record(ROUTE_GENERATE)
+    return RouteDecision(ROUTE_GENERATE, None, key)
+
+
+def remember_result(key: Optional[str], result_id: str, result: str) -> None:
+    """
+    Remember the stored result of a request so an identical request can be
+    answered locally. Errors and warnings (starting with ❌ or ⚠️) are not reused.
+    """
+    if not key or not result_id or not result or result.startswith(("❌", "⚠️")):
+        return
+    with _lock:
+        _recent[key] = (time.monotonic(), result_id)
+        _recent.move_to_end(key)
+        while len(_recent) > RECENT_MAX_ENTRIES:
+            _recent.popitem(last=False)
+
+
+def router_stats() -> dict:
+    """
+    Return per-route counters for this process, plus `llm_runs_avoided`.
+
+    Only small talk and duplicates count as avoided runs: missing-input and
+    rejected requests never reached the agents, with or without the router.
+    """
+    with _lock:
+        stats = dict(_stats)
+    stats["llm_runs_avoided"] = stats[ROUTE_SMALL_TALK] + stats[ROUTE_DUPLICATE]
+    return stats
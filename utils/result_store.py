@@ -0,0 +1,91 @@
+# utils/result_store.py
+"""
+Bounded, process-wide storage for generated cases and the per-request size cap.
+
+Sessions keep only a short result id in `st.session_state`; the case text
+lives once per worker in an LRU that is limited both by entry count and by
+total size, so memory does not grow with the number of open sessions.
+"""
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+# Uploads larger than this are rejected before any blob or LLM work
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(25 * 1024 * 1024)))
+
+# Limits for the LRU of recent outputs
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "64"))
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_results: "OrderedDict[str, str]" = OrderedDict()
+_total_bytes = 0
+
+
+def _size(text: str) -> int:
+    # Upper bound on what CPython keeps for the string, without encoding it
+    return len(text) * (1 if text.isascii() else 4)
+
+
+class RequestTooLarge(Exception):
+    """Raised when a downloaded file exceeds MAX_REQUEST_BYTES; str() is the user-facing message."""
+
+
+def request_too_large(num_bytes: Optional[int]) -> Optional[str]:
+    """
+    Return a user-facing rejection message if a request exceeds
+    MAX_REQUEST_BYTES, otherwise None.
+    """
+    if num_bytes is None or num_bytes <= MAX_REQUEST_BYTES:
+        return None
+    return (
+        f"⚠️ File is {num_bytes / 1024 / 1024:.1f} MB; the limit is "
+        f"{MAX_REQUEST_BYTES / 1024 / 1024:.0f} MB. Please upload a smaller document."
+    )
+
+
+def check_request_size(num_bytes: Optional[int]) -> None:
+    """
+    Raises:
+        RequestTooLarge: If the request exceeds MAX_REQUEST_BYTES.
+    """
+    rejection = request_too_large(num_bytes)
+    if rejection:
+        raise RequestTooLarge(rejection)
+
+
+def store_result(text: str) -> str:
+    """
+    Keep a generated case in the LRU and return its result id.
+    Least recently used entries are evicted to stay within the limits.
+    """
+    global _total_bytes
+    result_id = uuid.uuid4().hex[:12]
+    with _lock:
+        _results[result_id] = text
+        _total_bytes += _size(text)
+        while len(_results) > 1 and (
+            len(_results) > RESULT_STORE_MAX_ENTRIES or _total_bytes > RESULT_STORE_MAX_BYTES
+        ):
+            _, evicted = _results.popitem(last=False)
+            _total_bytes -= _size(evicted)
+    return result_id
+
+
+def get_result(result_id: Optional[str]) -> Optional[str]:
+    """Return the case for a result id, or None if it was never stored or was evicted."""
+    if not result_id:
+        return None
+    with _lock:
+        text = _results.get(result_id)
+        if text is not None:
+            _results.move_to_end(result_id)
+        return text
+
+
+def result_store_stats() -> dict:
+    """Return the number of stored results and their approximate size in bytes."""
+    with _lock:
+        return {"entries": len(_results), "bytes": _total_bytes}
@@ -0,0 +1,105 @@
+# utils/warmup.py
+"""
+Warm-up helpers so the first user request is not a cold one.
+
+`python -m utils.warmup` runs from entrypoint.sh before supervisord starts the
+Streamlit workers. It imports the heavy dependencies once (leaving their
+.pyc files in the OS page cache), downloads the writer's guide into the
+shared CASE_CACHE_DIR and checks the blob connection. It then prints the
+import time for each module. Imports and connection pools belong to a single
+process, so each worker also calls `preload_worker` in a background thread
+on its first page view. That loads only what the app itself uses.
+"""
+import importlib
+import os
+import sys
+import time
+from typing import Optional
+
+import dotenv
+
+# Imported lazily by the app's case workflow (utils/agentic_workflow.py)
+APP_MODULES = (
+    "azure.storage.blob",
+    "PyPDF2",
+    "docx",
+)
+
+# Container start-up also warms the agent crew's dependencies on disk
+HEAVY_MODULES = APP_MODULES + (
+    "litellm",
+    "crewai",
+)
+
+
+def preload_modules(modules=HEAVY_MODULES) -> dict:
+    """
+    Import each module and return {name: seconds}, or None when not installed.
+    """
+    timings = {}
+    for name in modules:
+        already_loaded = name in sys.modules
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            timings[name] = None
+            continue
+        timings[name] = 0.0 if already_loaded else time.perf_counter() - start
+    return timings
+
+
+def preload_worker() -> None:
+    """
+    Warm a Streamlit worker: import APP_MODULES and open a pooled blob
+    connection with a cheap container request. Never raises.
+    """
+    preload_modules(APP_MODULES)
+    connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    container_name = os.getenv("AZURE_CONTAINER_NAME")
+    if not connection_string or not container_name:
+        return
+    try:
+        from utils.blob_cache import get_blob_service_client
+
+        get_blob_service_client(connection_string).get_container_client(container_name).exists()
+    except Exception as e:
+        print(f"[⚠️] Blob connection warm-up failed: {e}")
+
+
+def prefetch_guide() -> Optional[str]:
+    """
+    Download the writer's guide into the shared cache and return its local path.
+    Returns None when blob storage is not configured.
+    """
+    if not os.getenv("AZURE_STORAGE_CONNECTION_STRING") or not os.getenv("AZURE_CONTAINER_NAME"):
+        print("[⚠️] Blob storage not configured, skipping guide prefetch")
+        return None
+    from utils.agentic_workflow import GUIDE_BLOB_PATH
+    from utils.blob_cache import download_blob_cached
+
+    return download_blob_cached(GUIDE_BLOB_PATH)
+
+
+def main() -> None:
+    dotenv.load_dotenv()
+    print("[🔥] Warm-up: importing heavy modules")
+    total = 0.0
+    for name, seconds in preload_modules().items():
+        if seconds is None:
+            print(f"    {name:<22} not installed")
+        else:
+            total += seconds
+            print(f"    {name:<22} {seconds * 1000:8.1f} ms")
+    print(f"    {'total':<22} {total * 1000:8.1f} ms")
+
+    start = time.perf_counter()
+    try:
+        if prefetch_guide():
+            print(f"[🔥] Guide ready in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except Exception as e:
+        print(f"[⚠️] Guide prefetch failed: {e}")
+
+
+if __name__ == "__main__":
+    main()